@@ -2,6 +2,7 @@ import csv
 import math
 from pathlib import Path
 from collections import defaultdict
+from functools import lru_cache
 
 # Tenta importar pandas para ler arquivos Excel
 try:
@@ -82,21 +83,19 @@ def parse_numero_br(valor):
     return float(s)
 
 
+# Tabela de acentos aplicada em uma única passada (após o upper())
+_TABELA_ACENTOS = str.maketrans("ÓÔÕÍÁÀÃÉÊÚÇ", "OOOIAAAEEUC")
+
+
+@lru_cache(maxsize=8192)
+def _normalizar_str(s: str) -> str:
+    return s.upper().translate(_TABELA_ACENTOS)
+
+
 def normalizar_texto(txt):
     if txt is None:
         return ""
-    s = str(txt).upper()
-    substituicoes = [
-        ("Ó", "O"), ("Ô", "O"), ("Õ", "O"),
-        ("Í", "I"),
-        ("Á", "A"), ("À", "A"), ("Ã", "A"),
-        ("É", "E"), ("Ê", "E"),
-        ("Ú", "U"),
-        ("Ç", "C"),
-    ]
-    for ac, sem in substituicoes:
-        s = s.replace(ac, sem)
-    return s
+    return _normalizar_str(str(txt))
 
 
 def extrair_descricao_linha(linha: dict):
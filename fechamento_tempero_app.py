@@ -1,5 +1,4 @@
 import re
-from collections import defaultdict
 from datetime import datetime
 from io import BytesIO
 from pathlib import Path
@@ -9,32 +8,32 @@ APP_VERSION = Path("VERSION").read_text(encoding="utf-8").strip()
 import altair as alt
 import pandas as pd
 import streamlit as st
-from openpyxl.styles import Alignment, Font
 
 from modules.auth import check_auth, current_role, current_user, has_role, require_role
-from modules.caixa import lancar_importados_gmail, load_cash_from_gdrive, save_cash_to_gdrive
+from modules.caixa import lancar_importados_gmail, load_cash_from_gdrive, save_cash_to_gdrive, totais_caixa
 from modules.gmail_suitable import buscar_fechamentos_gmail
 from modules.categorias import (
     CATEGORIAS_PADRAO,
     carregar_categorias_personalizadas,
     carregar_regras,
-    classificar_categoria,
+    classificar_movimentos,
     get_regras_sessao,
     reload_regras_sessao,
     salvar_categorias_personalizadas,
     salvar_regras,
 )
-from modules.excel import formatar_tabela_excel
+from modules.excel import gerar_planilha_excel
 from modules.extratos import carregar_extrato_itau_upload, carregar_extrato_pagseguro_upload
 from modules.gdrive import (
     delete_history_file,
-    download_history_file,
+    download_history_bytes,
+    download_history_files,
     list_fechamentos_history_files,
     list_history_from_gdrive,
     load_fechamento_report_from_gdrive,
     upload_history_to_gdrive,
 )
-from modules.ui import inject_css, metric_card_html
+from modules.ui import formatar_colunas_moeda, inject_css, metric_cards_row_html
 from modules.utils import format_currency, get_ano_mes, normalizar_texto, parse_numero_br, slugify
 from modules.validacao import exibir_painel_validacao, validar_consistencia_fechamento
 from modules.controle_anual import carregar_dre_anual, calcular_cmv, gerar_alertas
@@ -162,10 +161,17 @@ if st.session_state.get("cash_loaded_for") != _cache_key:
     st.session_state["df_caixa_mes"] = load_cash_from_gdrive(_ano_mes_caixa)
     st.session_state["cash_loaded_for"] = _cache_key
 
-df_dinheiro_periodo = st.session_state["df_caixa_mes"].copy()
-if not df_dinheiro_periodo.empty and "Data" in df_dinheiro_periodo.columns:
-    df_dinheiro_periodo["Data"] = pd.to_datetime(
-        df_dinheiro_periodo["Data"], dayfirst=True, errors="coerce"
+# O caixa guardado na sessão já tem Data convertida (load_cash_from_gdrive e o
+# botão Salvar fazem o parse uma vez): só reconverte se vier em outro formato.
+# Nada abaixo altera o frame no lugar (assign), então não é preciso copiá-lo.
+df_dinheiro_periodo = st.session_state["df_caixa_mes"]
+if (
+    not df_dinheiro_periodo.empty
+    and "Data" in df_dinheiro_periodo.columns
+    and not pd.api.types.is_datetime64_any_dtype(df_dinheiro_periodo["Data"])
+):
+    df_dinheiro_periodo = df_dinheiro_periodo.assign(
+        Data=pd.to_datetime(df_dinheiro_periodo["Data"], dayfirst=True, errors="coerce")
     )
 
 # ========================
@@ -181,6 +187,7 @@ saldo_final = saldo_inicial = 0.0
 ent_itau = sai_itau = res_itau = 0.0
 ent_pag = sai_pag = res_pag = 0.0
 entradas_dinheiro_periodo = saidas_dinheiro_periodo = saldo_dinheiro_periodo = 0.0
+metricas_fechamento: dict[str, str] = {}
 
 df_mov = pd.DataFrame()
 df_cat_export = pd.DataFrame()
@@ -188,7 +195,9 @@ df_resumo_contas = pd.DataFrame()
 df_consolidado = pd.DataFrame()
 excel_buffer: BytesIO | None = None
 
-if arquivo_itau and arquivo_pag:
+# Os resultados só são exibidos nas abas de admin (Fechamento e Conferência):
+# para os demais perfis não vale ler extratos nem montar o relatório.
+if arquivo_itau and arquivo_pag and has_role("admin"):
     try:
         saldo_inicial = parse_numero_br(saldo_inicial_input)
     except Exception:
@@ -200,17 +209,16 @@ if arquivo_itau and arquivo_pag:
             ent_itau, sai_itau, res_itau, mov_itau = carregar_extrato_itau_upload(arquivo_itau)
             ent_pag, sai_pag, res_pag, mov_pag = carregar_extrato_pagseguro_upload(arquivo_pag)
 
-            # Descobre meses presentes nos extratos
-            meses_extratos: set[str] = set()
-            for mov in mov_itau + mov_pag:
-                d = mov.get("data")
-                if not d:
-                    continue
-                dt = pd.to_datetime(d, dayfirst=True, errors="coerce")
-                if not pd.isna(dt):
-                    meses_extratos.add(dt.strftime("%Y-%m"))
-
-            meses_extratos = sorted(meses_extratos)
+            # Descobre meses presentes nos extratos: um único parse das datas e
+            # comparação por período mensal (format="mixed" interpreta cada
+            # valor isoladamente, como o parse item a item fazia)
+            datas_extratos = pd.to_datetime(
+                pd.Series([m.get("data") for m in mov_itau + mov_pag if m.get("data")], dtype=object),
+                dayfirst=True,
+                errors="coerce",
+                format="mixed",
+            )
+            meses_extratos = sorted(str(p) for p in datas_extratos.dt.to_period("M").dropna().unique())
 
             if not meses_extratos:
                 raise RuntimeError(
@@ -233,12 +241,12 @@ if arquivo_itau and arquivo_pag:
             # Caixa em dinheiro do mesmo mês
             df_dinheiro_periodo_fechar = load_cash_from_gdrive(mes_extrato)
 
-            df_din_validos = df_dinheiro_periodo_fechar.copy()
+            # Só lançamentos com valor positivo (filtro por máscara, sem copiar o caixa antes)
+            df_din_validos = df_dinheiro_periodo_fechar
             if not df_din_validos.empty and "Valor" in df_din_validos.columns:
-                df_din_validos = df_din_validos[df_din_validos["Valor"] > 0]
+                df_din_validos = df_din_validos.loc[df_din_validos["Valor"] > 0]
 
-            entradas_dinheiro_periodo = df_din_validos.loc[df_din_validos["Tipo"] == "Entrada", "Valor"].sum()
-            saidas_dinheiro_periodo = df_din_validos.loc[df_din_validos["Tipo"] == "Saída", "Valor"].sum()
+            entradas_dinheiro_periodo, saidas_dinheiro_periodo = totais_caixa(df_din_validos)
             saldo_dinheiro_periodo = entradas_dinheiro_periodo - saidas_dinheiro_periodo
 
             # Consolidado
@@ -246,49 +254,51 @@ if arquivo_itau and arquivo_pag:
             saidas_totais = sai_itau + sai_pag - saidas_dinheiro_periodo
             resultado_consolidado = entradas_totais + saidas_totais
             saldo_final = saldo_inicial + resultado_consolidado
+            metricas_fechamento = {
+                "Entradas totais": format_currency(entradas_totais),
+                "Saídas totais": format_currency(saidas_totais),
+                "Resultado do período": format_currency(resultado_consolidado),
+            }
 
             # Monta lista de movimentos
             movimentos = mov_itau + mov_pag
             if not df_din_validos.empty:
-                for _, linha in df_din_validos.iterrows():
-                    valor = float(linha.get("Valor", 0.0) or 0.0)
-                    if str(linha.get("Tipo", "")) == "Saída":
-                        valor = -valor
-                    movimentos.append({
-                        "data": linha.get("Data"),
-                        "descricao": linha.get("Descrição"),
-                        "valor": valor,
-                        "conta": "Dinheiro",
-                    })
-
-            movimentos_cat = [
-                {
-                    "Data": mov.get("data"),
-                    "Conta": mov.get("conta"),
-                    "Descrição": mov.get("descricao"),
-                    "Categoria": classificar_categoria(mov, regras),
-                    "Valor": mov.get("valor", 0.0),
-                }
-                for mov in movimentos
-            ]
-            df_mov = pd.DataFrame(movimentos_cat)
+                # Saídas do caixa entram negativas, como nos extratos
+                valores_din = df_din_validos["Valor"].astype(float)
+                valores_din = valores_din.where(df_din_validos["Tipo"].astype(str) != "Saída", -valores_din)
+                movimentos.extend(
+                    {"data": data, "descricao": descricao, "valor": v, "conta": "Dinheiro"}
+                    for data, descricao, v in zip(
+                        df_din_validos["Data"].tolist(),
+                        df_din_validos["Descrição"].tolist(),
+                        valores_din.tolist(),
+                    )
+                )
+
+            # Monta o DataFrame por colunas (sem um dict intermediário por movimento)
+            df_mov = pd.DataFrame({
+                "Data": [mov.get("data") for mov in movimentos],
+                "Conta": [mov.get("conta") for mov in movimentos],
+                "Descrição": [mov.get("descricao") for mov in movimentos],
+                "Categoria": classificar_movimentos(movimentos, regras),
+                "Valor": [mov.get("valor", 0.0) for mov in movimentos],
+            })
             if not df_mov.empty and "Data" in df_mov.columns:
                 df_mov["Data"] = pd.to_datetime(df_mov["Data"], dayfirst=True, errors="coerce")
 
-            entradas_cat: dict[str, float] = defaultdict(float)
-            saidas_cat: dict[str, float] = defaultdict(float)
-            for _, row in df_mov.iterrows():
-                cat, v = row["Categoria"], row["Valor"]
-                if v > 0:
-                    entradas_cat[cat] += v
-                elif v < 0:
-                    saidas_cat[cat] += v
-
-            categorias_calc = sorted(set(entradas_cat) | set(saidas_cat))
-            df_cat_export = pd.DataFrame([
-                {"Categoria": cat, "Entradas": entradas_cat.get(cat, 0.0), "Saídas": saidas_cat.get(cat, 0.0)}
-                for cat in categorias_calc
-            ])
+            # Entradas/saídas por categoria: um único groupby sobre a Categoria
+            # como dtype category (ordenada alfabeticamente, como antes)
+            df_mov_nz = df_mov[df_mov["Valor"].fillna(0) != 0]
+            df_cat_export = (
+                pd.DataFrame({
+                    "Entradas": df_mov_nz["Valor"].clip(lower=0),
+                    "Saídas": df_mov_nz["Valor"].clip(upper=0),
+                })
+                .groupby(df_mov_nz["Categoria"].astype("category"), observed=True)
+                .sum()
+                .rename_axis("Categoria")
+                .reset_index()
+            )
 
             df_resumo_contas = pd.DataFrame([
                 {"Conta": "Itaú", "Entradas": ent_itau, "Saídas": sai_itau, "Resultado": res_itau},
@@ -313,40 +323,15 @@ if arquivo_itau and arquivo_pag:
                 df_mov, df_resumo_contas, df_consolidado, saldo_inicial
             )
 
-            # Gera Excel
-            buffer = BytesIO()
-            with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
-                start_row_resumo = 3
-                df_resumo_contas.to_excel(writer, sheet_name="Resumo", index=False, startrow=start_row_resumo)
-
-                start_row_consol = start_row_resumo + len(df_resumo_contas) + 3
-                df_consolidado.to_excel(writer, sheet_name="Resumo", index=False, startrow=start_row_consol)
-
-                df_consolidado.to_excel(writer, sheet_name="ResumoDados", index=False)
-                df_cat_export.to_excel(writer, sheet_name="Categorias", index=False, startrow=1)
-                df_mov.to_excel(writer, sheet_name="Movimentos", index=False, startrow=1)
-                df_dinheiro_periodo_fechar.to_excel(writer, sheet_name="Dinheiro", index=False, startrow=1)
-
-                ws_res = writer.sheets["Resumo"]
-                ws_cat = writer.sheets["Categorias"]
-                ws_mov = writer.sheets["Movimentos"]
-                ws_din = writer.sheets["Dinheiro"]
-
-                ws_res["A1"] = f"Fechamento Tempero das Gurias - {nome_periodo}"
-                ws_res["A1"].font = Font(bold=True, size=14)
-                ws_res["A1"].alignment = Alignment(horizontal="left")
-
-                formatar_tabela_excel(ws_res, df_resumo_contas, start_row=start_row_resumo)
-                formatar_tabela_excel(ws_res, df_consolidado, start_row=start_row_consol)
-                if not df_cat_export.empty:
-                    formatar_tabela_excel(ws_cat, df_cat_export, start_row=1)
-                if not df_mov.empty:
-                    formatar_tabela_excel(ws_mov, df_mov, start_row=1)
-                if not df_dinheiro_periodo_fechar.empty:
-                    formatar_tabela_excel(ws_din, df_dinheiro_periodo_fechar, start_row=1)
-
-            buffer.seek(0)
-            excel_buffer = buffer
+            # Gera Excel (cacheado: só reconstrói quando os dados mudam)
+            excel_buffer = BytesIO(gerar_planilha_excel(
+                nome_periodo,
+                df_resumo_contas,
+                df_consolidado,
+                df_cat_export,
+                df_mov,
+                df_dinheiro_periodo_fechar,
+            ))
             dados_carregados = True
 
         except RuntimeError as e:
@@ -379,12 +364,22 @@ with tab1:
     )
 
     if df_dinheiro_periodo.empty:
-        df_dinheiro_periodo = pd.DataFrame(
-            [{"Data": pd.Timestamp.today().normalize(), "Descrição": "", "Tipo": "Entrada", "Valor": 0.0}],
-            columns=["Data", "Descrição", "Tipo", "Valor"],
-        )
+        # Linha modelo criada uma vez por dia na sessão: o editor não recebe um frame
+        # novo a cada rerun, e uma sessão aberta após a meia-noite já sugere a data de hoje
+        hoje = pd.Timestamp.today().normalize()
+        if st.session_state.get("df_dinheiro_default_data") != hoje:
+            st.session_state["df_dinheiro_default"] = pd.DataFrame(
+                [{"Data": hoje, "Descrição": "", "Tipo": "Entrada", "Valor": 0.0}],
+                columns=["Data", "Descrição", "Tipo", "Valor"],
+            )
+            st.session_state["df_dinheiro_default_data"] = hoje
+        df_dinheiro_periodo = st.session_state["df_dinheiro_default"]
 
-    df_dinheiro_periodo["Data"] = pd.to_datetime(df_dinheiro_periodo["Data"], errors="coerce")
+    # O caixa da sessão e a linha modelo já chegam com Data em datetime64
+    if not pd.api.types.is_datetime64_any_dtype(df_dinheiro_periodo["Data"]):
+        df_dinheiro_periodo = df_dinheiro_periodo.assign(
+            Data=pd.to_datetime(df_dinheiro_periodo["Data"], errors="coerce")
+        )
 
     df_dinheiro_ui = st.data_editor(
         df_dinheiro_periodo,
@@ -400,10 +395,11 @@ with tab1:
         key=f"editor_dinheiro_{_ano_mes_caixa or 'padrao'}",
     )
 
-    df_din_limpo = df_dinheiro_ui.copy()
+    # Remove linhas vazias com um único filtro (sem copiar o DataFrame antes)
+    df_din_limpo = df_dinheiro_ui
     if not df_din_limpo.empty:
-        df_din_limpo = df_din_limpo[
-            ~((df_din_limpo["Valor"].fillna(0) == 0) & (df_din_limpo["Descrição"].fillna("").str.strip() == ""))
+        df_din_limpo = df_din_limpo.loc[
+            (df_din_limpo["Valor"].fillna(0) != 0) | (df_din_limpo["Descrição"].fillna("").str.strip() != "")
         ]
 
     col_btn1, _ = st.columns([1, 3])
@@ -413,9 +409,10 @@ with tab1:
     if salvar_caixa:
         try:
             save_cash_to_gdrive(_ano_mes_caixa, df_din_limpo)
-            _df_save = df_din_limpo.copy()
+            # df_din_limpo já é um frame novo (saída do filtro): sem copy() extra
+            _df_save = df_din_limpo
             if not _df_save.empty and "Data" in _df_save.columns:
-                _df_save["Data"] = pd.to_datetime(_df_save["Data"], errors="coerce")
+                _df_save = _df_save.assign(Data=pd.to_datetime(_df_save["Data"], errors="coerce"))
             st.session_state["df_caixa_mes"] = _df_save
             st.session_state["cash_loaded_for"] = _cache_key
             st.success("Lançamentos de dinheiro salvos com sucesso no Google Drive!")
@@ -472,12 +469,7 @@ with tab1:
                         except Exception as e:
                             st.error(f"Erro ao importar lançamentos: {e}")
 
-    df_din_calc = df_din_limpo.copy()
-    if not df_din_calc.empty and "Valor" in df_din_calc.columns:
-        df_din_calc = df_din_calc[df_din_calc["Valor"] > 0]
-
-    entradas_d = df_din_calc.loc[df_din_calc["Tipo"] == "Entrada", "Valor"].sum()
-    saidas_d = df_din_calc.loc[df_din_calc["Tipo"] == "Saída", "Valor"].sum()
+    entradas_d, saidas_d = totais_caixa(df_din_limpo)
 
     st.markdown("---")
     col_c1, col_c2, col_c3 = st.columns(3)
@@ -519,13 +511,14 @@ with tab2:
                 sf_h = float(linha.get("Saldo final", 0.0) or 0.0)
 
                 st.markdown("---")
-                m1, m2, m3 = st.columns(3)
-                with m1:
-                    st.markdown(metric_card_html("Entradas totais", format_currency(ent_h)), unsafe_allow_html=True)
-                with m2:
-                    st.markdown(metric_card_html("Saídas totais", format_currency(sai_h)), unsafe_allow_html=True)
-                with m3:
-                    st.markdown(metric_card_html("Resultado do período", format_currency(res_h)), unsafe_allow_html=True)
+                st.markdown(
+                    metric_cards_row_html([
+                        ("Entradas totais", format_currency(ent_h)),
+                        ("Saídas totais", format_currency(sai_h)),
+                        ("Resultado do período", format_currency(res_h)),
+                    ]),
+                    unsafe_allow_html=True,
+                )
 
                 st.markdown("---")
                 st.markdown('<div class="tempero-section-title">🏁 Consolidado da loja</div>', unsafe_allow_html=True)
@@ -538,24 +531,14 @@ with tab2:
             if df_res_contas_h.empty:
                 st.info("Não foi possível extrair o resumo por conta da aba **Resumo**.")
             else:
-                df_show = df_res_contas_h.copy()
-                for col in ["Entradas", "Saídas", "Resultado"]:
-                    if col in df_show.columns:
-                        df_show[col] = df_show[col].apply(
-                            lambda x: format_currency(float(x)) if pd.notna(x) else "-"
-                        )
+                df_show = formatar_colunas_moeda(df_res_contas_h, ["Entradas", "Saídas", "Resultado"])
                 st.dataframe(df_show, use_container_width=True)
 
             st.markdown('<div class="tempero-section-title">📌 Resumo por categoria (do relatório)</div>', unsafe_allow_html=True)
             if df_cat_h.empty:
                 st.info("Este relatório não possui a aba **Categorias**.")
             else:
-                df_cat_disp = df_cat_h.copy()
-                for col in ["Entradas", "Saídas"]:
-                    if col in df_cat_disp.columns:
-                        df_cat_disp[col] = df_cat_disp[col].apply(
-                            lambda x: format_currency(float(x)) if pd.notna(x) else "-"
-                        )
+                df_cat_disp = formatar_colunas_moeda(df_cat_h, ["Entradas", "Saídas"])
                 st.dataframe(df_cat_disp, use_container_width=True)
 
         st.markdown("---")
@@ -573,13 +556,7 @@ with tab2:
                 exibir_painel_validacao(avisos_validacao)
 
             st.markdown("---")
-            m1, m2, m3 = st.columns(3)
-            with m1:
-                st.markdown(metric_card_html("Entradas totais", format_currency(entradas_totais)), unsafe_allow_html=True)
-            with m2:
-                st.markdown(metric_card_html("Saídas totais", format_currency(saidas_totais)), unsafe_allow_html=True)
-            with m3:
-                st.markdown(metric_card_html("Resultado do período", format_currency(resultado_consolidado)), unsafe_allow_html=True)
+            st.markdown(metric_cards_row_html(metricas_fechamento.items()), unsafe_allow_html=True)
 
             st.markdown("---")
             st.markdown('<div class="tempero-section-title">📑 Resumo por conta</div>', unsafe_allow_html=True)
@@ -611,10 +588,7 @@ with tab2:
                 '<div class="tempero-section-sub">Baseado nas categorias atuais (já considera regras salvas anteriormente).</div>',
                 unsafe_allow_html=True,
             )
-            df_cat_display = df_cat_export.copy()
-            if not df_cat_display.empty:
-                df_cat_display["Entradas"] = df_cat_display["Entradas"].map(format_currency)
-                df_cat_display["Saídas"] = df_cat_display["Saídas"].map(format_currency)
+            df_cat_display = formatar_colunas_moeda(df_cat_export, ["Entradas", "Saídas"])
             st.dataframe(df_cat_display, use_container_width=True)
 
             st.markdown('<div class="tempero-section-title">📥 Relatório do período atual</div>', unsafe_allow_html=True)
@@ -665,12 +639,7 @@ with tab3:
             if df_cat_h.empty:
                 st.info("Este relatório não possui a aba **Categorias**.")
             else:
-                df_cat_disp = df_cat_h.copy()
-                for col in ["Entradas", "Saídas"]:
-                    if col in df_cat_disp.columns:
-                        df_cat_disp[col] = df_cat_disp[col].apply(
-                            lambda x: format_currency(float(x)) if pd.notna(x) else "-"
-                        )
+                df_cat_disp = formatar_colunas_moeda(df_cat_h, ["Entradas", "Saídas"])
                 st.dataframe(df_cat_disp, use_container_width=True)
 
             st.markdown("---")
@@ -767,6 +736,10 @@ with tab4:
 
     st.markdown('<div class="tempero-section-title">📊 Histórico de fechamentos e comparativo</div>', unsafe_allow_html=True)
 
+    if st.button("🔄 Atualizar lista", key="btn_atualizar_historico"):
+        list_history_from_gdrive.clear()
+        st.rerun()
+
     try:
         arquivos = list_history_from_gdrive()
     except Exception as e:
@@ -782,14 +755,20 @@ with tab4:
             unsafe_allow_html=True,
         )
 
+        # Baixa todos os relatórios em paralelo (e cacheados por versão) antes de ler
+        fechamentos_hist = list_fechamentos_history_files(arquivos)
+        conteudos_hist = download_history_files(fechamentos_hist)
+
         resumos = []
-        for file_info in arquivos:
-            if not str(file_info.get("name", "")).startswith("fechamento_tempero_"):
+        for file_info in fechamentos_hist:
+            conteudo = conteudos_hist.get(file_info["id"])
+            if conteudo is None:
                 continue
             try:
-                buf = download_history_file(file_info["id"])
+                buf = BytesIO(conteudo)
                 try:
-                    df_consol = pd.read_excel(buf, sheet_name="ResumoDados")
+                    # Só a primeira linha é usada: o leitor para de percorrer a aba depois dela
+                    df_consol = pd.read_excel(buf, sheet_name="ResumoDados", nrows=1)
                 except Exception:
                     buf.seek(0)
                     df_res = pd.read_excel(buf, sheet_name="Resumo")
@@ -816,12 +795,7 @@ with tab4:
         else:
             df_hist = pd.DataFrame(resumos).iloc[::-1].reset_index(drop=True)
 
-            df_display = df_hist.copy()
-            for col in ["Entradas", "Saídas", "Resultado", "Saldo final"]:
-                if col in df_display.columns:
-                    df_display[col] = df_display[col].apply(
-                        lambda x: format_currency(x) if pd.notna(x) else "-"
-                    )
+            df_display = formatar_colunas_moeda(df_hist, ["Entradas", "Saídas", "Resultado", "Saldo final"])
             st.dataframe(df_display, use_container_width=True)
 
             st.markdown("**Resultado por período:**")
@@ -917,10 +891,9 @@ with tab4:
 
             with col_b:
                 try:
-                    buf = download_history_file(file_id)
                     st.download_button(
                         label="Baixar",
-                        data=buf.getvalue(),
+                        data=download_history_bytes(file_id, mod_raw),
                         file_name=nome,
                         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
                         key=f"baixar_{file_id}",
@@ -1001,15 +974,15 @@ with tab5:
         n_meses = len(meses_anual) or 1
         media_resultado = resultado_operacional / n_meses
 
-        col1, col2, col3, col4 = st.columns(4)
-        with col1:
-            st.markdown(metric_card_html("Receita do ano", format_currency(receita_total)), unsafe_allow_html=True)
-        with col2:
-            st.markdown(metric_card_html("Sobra média por mês", format_currency(media_resultado)), unsafe_allow_html=True)
-        with col3:
-            st.markdown(metric_card_html("Sobrou no ano", format_currency(resultado_operacional)), unsafe_allow_html=True)
-        with col4:
-            st.markdown(metric_card_html("Investido no ano", format_currency(invest_acumulado)), unsafe_allow_html=True)
+        st.markdown(
+            metric_cards_row_html([
+                ("Receita do ano", format_currency(receita_total)),
+                ("Sobra média por mês", format_currency(media_resultado)),
+                ("Sobrou no ano", format_currency(resultado_operacional)),
+                ("Investido no ano", format_currency(invest_acumulado)),
+            ]),
+            unsafe_allow_html=True,
+        )
 
         st.markdown("---")
 
@@ -1017,11 +990,8 @@ with tab5:
         st.markdown('<div class="tempero-section-title">DRE mensal por categoria</div>', unsafe_allow_html=True)
 
         df_dre = pd.DataFrame(linhas_dre)
-        df_dre_display = df_dre.copy()
-        for mes in meses_anual:
-            df_dre_display[mes] = df_dre_display[mes].apply(
-                lambda x: format_currency(x) if isinstance(x, (int, float)) and x != 0.0 else "—"
-            )
+        # Todos os meses formatados de uma vez; valores zerados aparecem como "—"
+        df_dre_display = formatar_colunas_moeda(df_dre.mask(df_dre == 0), meses_anual, vazio="—")
 
         st.dataframe(
             df_dre_display.set_index("Categoria"),
@@ -2,12 +2,12 @@ import hmac
 
 import streamlit as st
 
-from modules.ui import inject_css
-
 
 def _load_users_from_secrets() -> dict:
     """
     Lê usuários e perfis de st.secrets["auth_users"].
+    Sem cache: só roda ao clicar em Entrar, e assim revogar um usuário, trocar
+    senha ou perfil nas secrets vale já no próximo login.
 
     Estrutura esperada no secrets:
         [auth_users.ricardo]
@@ -55,7 +55,7 @@ def check_auth():
     if st.session_state.get("auth_ok"):
         return
 
-    inject_css()
+    # O CSS já foi injetado pelo app antes de check_auth(); não repete aqui.
     st.markdown(
         '<div class="tempero-title">Tempero das Gurias - Acesso Restrito</div>',
         unsafe_allow_html=True,
@@ -72,9 +72,8 @@ def check_auth():
     with col1:
         ok = st.button("Entrar")
 
-    users = _load_users_from_secrets()
-
     if ok:
+        users = _load_users_from_secrets()
         if users:
             user_cfg = users.get(username)
             if not user_cfg:
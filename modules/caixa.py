@@ -1,9 +1,14 @@
 from io import BytesIO
 
 import pandas as pd
-from googleapiclient.http import MediaIoBaseDownload, MediaIoBaseUpload
 
-from modules.gdrive import get_gdrive_service, get_history_folder_id
+from modules.gdrive import (
+    download_history_bytes,
+    get_gdrive_service,
+    get_history_folder_id,
+    list_history_from_gdrive,
+    make_media_upload,
+)
 
 
 def get_cash_file_name(ano_mes_ref: str | None) -> str:
@@ -12,16 +17,28 @@ def get_cash_file_name(ano_mes_ref: str | None) -> str:
     return f"caixa_dinheiro_{ano_mes_ref}.xlsx"
 
 
-def _get_cash_file_id(service, folder_id: str, ano_mes_ref: str | None) -> str | None:
+def _get_cash_file(service, folder_id: str, ano_mes_ref: str | None) -> dict | None:
+    """Consulta direta (sem cache) ao Drive: {id, modifiedTime} do caixa do mês, ou None."""
     filename = get_cash_file_name(ano_mes_ref)
     query = f"'{folder_id}' in parents and name = '{filename}' and trashed = false"
     results = (
         service.files()
-        .list(q=query, spaces="drive", fields="files(id, name)", pageSize=10)
+        .list(q=query, spaces="drive", fields="files(id, modifiedTime)", pageSize=1)
         .execute()
     )
     files = results.get("files", [])
-    return files[0]["id"] if files else None
+    return files[0] if files else None
+
+
+def totais_caixa(df: pd.DataFrame) -> tuple[float, float]:
+    """
+    Soma entradas e saídas do livro-caixa (somente valores positivos) em um
+    único groupby por Tipo. Retorna (entradas, saidas), ambos positivos.
+    """
+    if df.empty or "Valor" not in df.columns or "Tipo" not in df.columns:
+        return 0.0, 0.0
+    somas = df.loc[df["Valor"] > 0].groupby("Tipo", sort=False)["Valor"].sum()
+    return float(somas.get("Entrada", 0.0)), float(somas.get("Saída", 0.0))
 
 
 def load_cash_from_gdrive(ano_mes_ref: str | None) -> pd.DataFrame:
@@ -31,22 +48,22 @@ def load_cash_from_gdrive(ano_mes_ref: str | None) -> pd.DataFrame:
     """
     _cols = ["Data", "Descrição", "Tipo", "Valor"]
     try:
+        # Consulta direta (não a listagem cacheada do histórico): o caixa é lido
+        # para ser editado e regravado, e uma versão atrasada sobrescreveria
+        # lançamentos salvos por outra sessão
         service = get_gdrive_service()
-        folder_id = get_history_folder_id(service)
-        file_id = _get_cash_file_id(service, folder_id, ano_mes_ref)
+        arquivo = _get_cash_file(service, get_history_folder_id(service), ano_mes_ref)
 
-        if not file_id:
+        if not arquivo:
             return pd.DataFrame(columns=_cols)
 
-        request = service.files().get_media(fileId=file_id)
-        buf = BytesIO()
-        downloader = MediaIoBaseDownload(buf, request)
-        done = False
-        while not done:
-            _, done = downloader.next_chunk()
-        buf.seek(0)
-
-        df = pd.read_excel(buf)
+        # O download é reaproveitado enquanto o modifiedTime não mudar.
+        # Só as 4 colunas do livro-caixa são convertidas; colunas extras
+        # (anotações feitas à mão na planilha) nem chegam ao DataFrame
+        df = pd.read_excel(
+            BytesIO(download_history_bytes(arquivo["id"], arquivo.get("modifiedTime", ""))),
+            usecols=lambda c: str(c).strip() in _cols,
+        )
         df.columns = [str(c).strip() for c in df.columns]
         for col in _cols:
             if col not in df.columns:
@@ -69,11 +86,15 @@ def lancar_importados_gmail(ano_mes_ref: str | None, novos: list[dict]) -> tuple
     """
     df_atual = load_cash_from_gdrive(ano_mes_ref)
 
-    # Normaliza datas do df_atual para comparação
-    if not df_atual.empty and "Data" in df_atual.columns:
-        df_atual["_data_str"] = pd.to_datetime(df_atual["Data"], errors="coerce").dt.strftime("%Y-%m-%d")
-    else:
-        df_atual["_data_str"] = pd.Series(dtype=str)
+    # Chaves (Data + Descrição + Valor) do caixa atual, montadas uma única vez:
+    # cada item importado vira uma consulta O(1) em vez de filtrar o DataFrame.
+    existentes: set[tuple] = set()
+    if not df_atual.empty:
+        existentes = set(zip(
+            pd.to_datetime(df_atual["Data"], errors="coerce").dt.normalize(),
+            df_atual["Descrição"].fillna("").astype(str).str.strip(),
+            df_atual["Valor"].fillna(0).astype(float).round(2),
+        ))
 
     inseridos = 0
     duplicatas = 0
@@ -81,19 +102,14 @@ def lancar_importados_gmail(ano_mes_ref: str | None, novos: list[dict]) -> tuple
 
     for item in novos:
         data_item = item["Data"]
-        data_str = data_item.strftime("%Y-%m-%d") if hasattr(data_item, "strftime") else str(data_item)
         desc = str(item.get("Descrição", "")).strip()
         valor = float(item.get("Valor", 0.0))
 
-        # Verifica duplicata
-        if not df_atual.empty:
-            duplicado = (
-                (df_atual["_data_str"] == data_str)
-                & (df_atual["Descrição"].fillna("").astype(str).str.strip() == desc)
-                & (df_atual["Valor"].fillna(0).astype(float).round(2) == round(valor, 2))
-            ).any()
-        else:
-            duplicado = False
+        data_key = pd.to_datetime(data_item, errors="coerce")
+        duplicado = (
+            not pd.isna(data_key)
+            and (data_key.normalize(), desc, round(valor, 2)) in existentes
+        )
 
         if duplicado:
             duplicatas += 1
@@ -108,14 +124,13 @@ def lancar_importados_gmail(ano_mes_ref: str | None, novos: list[dict]) -> tuple
 
     if novos_rows:
         df_novos = pd.DataFrame(novos_rows, columns=["Data", "Descrição", "Tipo", "Valor"])
-        df_atual = df_atual.drop(columns=["_data_str"], errors="ignore")
         df_merged = pd.concat([df_atual, df_novos], ignore_index=True)
-        # Ordena por data
+        # Ordena por data (mergesort é estável e quase linear na entrada já
+        # quase ordenada; pula a ordenação se já estiver em ordem)
         df_merged["Data"] = pd.to_datetime(df_merged["Data"], errors="coerce")
-        df_merged = df_merged.sort_values("Data").reset_index(drop=True)
+        if not df_merged["Data"].is_monotonic_increasing:
+            df_merged = df_merged.sort_values("Data", kind="mergesort").reset_index(drop=True)
         save_cash_to_gdrive(ano_mes_ref, df_merged)
-    else:
-        df_atual = df_atual.drop(columns=["_data_str"], errors="ignore")
 
     return inseridos, duplicatas
 
@@ -124,22 +139,21 @@ def save_cash_to_gdrive(ano_mes_ref: str | None, df: pd.DataFrame):
     """Salva (ou atualiza) o livro-caixa mensal do dinheiro no Drive."""
     service = get_gdrive_service()
     folder_id = get_history_folder_id(service)
-    file_id = _get_cash_file_id(service, folder_id, ano_mes_ref)
+    arquivo = _get_cash_file(service, folder_id, ano_mes_ref)
+    file_id = arquivo["id"] if arquivo else None
     filename = get_cash_file_name(ano_mes_ref)
 
     buffer = BytesIO()
     with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
         df.to_excel(writer, sheet_name="CaixaDinheiro", index=False)
-    buffer.seek(0)
-
-    media = MediaIoBaseUpload(
-        buffer,
-        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        resumable=False,
+    media = make_media_upload(
+        buffer, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
     )
 
     if file_id:
-        service.files().update(fileId=file_id, media_body=media).execute()
+        service.files().update(fileId=file_id, media_body=media, fields="id").execute()
     else:
         metadata = {"name": filename, "parents": [folder_id]}
         service.files().create(body=metadata, media_body=media, fields="id").execute()
+    # Novo arquivo ou novo modifiedTime: mantém atualizada a listagem da aba Histórico
+    list_history_from_gdrive.clear()
@@ -1,4 +1,5 @@
 import json
+import re
 from pathlib import Path
 
 import streamlit as st
@@ -30,6 +31,22 @@ CATEGORIAS_PADRAO = [
 ]
 
 
+# ---------------------------------------------------------------------------
+# Leitura local com cache
+# ---------------------------------------------------------------------------
+
+@st.cache_data(show_spinner=False)
+def _ler_json_local_cache(caminho: str, mtime_ns: int):
+    """Lê um JSON local; o mtime (ns) entra na chave do cache para invalidar após escrita."""
+    with open(caminho, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _ler_json_local(path: Path):
+    """Lê um JSON local reaproveitando o cache enquanto o arquivo não mudar."""
+    return _ler_json_local_cache(str(path), path.stat().st_mtime_ns)
+
+
 # ---------------------------------------------------------------------------
 # Persistência de regras
 # ---------------------------------------------------------------------------
@@ -47,10 +64,9 @@ def carregar_regras() -> dict:
     # 2) fallback local
     if RULES_PATH.exists():
         try:
-            with RULES_PATH.open("r", encoding="utf-8") as f:
-                data = json.load(f)
-                if isinstance(data, dict):
-                    return data
+            data = _ler_json_local(RULES_PATH)
+            if isinstance(data, dict):
+                return data
         except Exception:
             pass
     return {}
@@ -84,10 +100,9 @@ def carregar_categorias_personalizadas() -> list[str]:
 
     if CATEGORIAS_PATH.exists():
         try:
-            with CATEGORIAS_PATH.open("r", encoding="utf-8") as f:
-                data = json.load(f)
-                if isinstance(data, list):
-                    categorias.extend(c for c in data if isinstance(c, str) and c.strip())
+            data = _ler_json_local(CATEGORIAS_PATH)
+            if isinstance(data, list):
+                categorias.extend(c for c in data if isinstance(c, str) and c.strip())
         except Exception:
             pass
 
@@ -125,6 +140,48 @@ def salvar_categorias_personalizadas(lista: list[str]):
 # Classificação
 # ---------------------------------------------------------------------------
 
+def _palavras(*palavras: str) -> re.Pattern:
+    """Compila as palavras-chave em uma única alternação (um scan por regra)."""
+    return re.compile("|".join(re.escape(p) for p in palavras))
+
+
+# Regras fixas, em ordem de prioridade: (categoria, palavras-chave, exigência extra opcional)
+_REGRAS_PADRAO: list[tuple[str, re.Pattern, re.Pattern | None]] = [
+    ("Sangria", _palavras("SANGRIA"), None),
+    ("Impostos e Encargos", _palavras("RECEITA FEDERAL", "RFB"), None),
+    ("Internet", _palavras("CLARO"), None),
+    ("Internet", _palavras("VIVO"), _palavras("CONCESSIONARIA", "VIVO-RS")),
+    ("Dedetização / Controle de Pragas", _palavras("ANTINSECT"), None),
+    ("Energia Elétrica", _palavras("CIA ESTADUAL DE DIST", "CEEE", "ENERGIA ELETRICA"), None),
+    ("Contabilidade e RH", _palavras("RECH CONTABILIDADE", "RECH CONT"), None),
+    (
+        "Fatura Cartão",
+        _palavras("BUSINESS      0503-2852", "BUSINESS 0503-2852", "ITAU UNIBANCO HOLDING S.A.", "CARTAO"),
+        None,
+    ),
+    ("Investimentos (Aplicações)", _palavras("APLICACAO", "CDB", "CREDBANCRF"), None),
+    (
+        "Rendimentos de Aplicações",
+        _palavras("REND PAGO APLIC", "RENDIMENTO APLIC", "REND APLIC", "RENDIMENTO"),
+        None,
+    ),
+    ("Aluguel Comercial", _palavras("ZOOP", "ALUGUEL"), None),
+    ("Motoboy / Entregas", _palavras("MOTOBOY", "ENTREGA"), None),
+    ("Folha de Pagamento", _palavras("CAROLINE", "VERONICA", "EVELLYN", "SALARIO", "FOLHA"), None),
+    ("Nutricionista", _palavras("ANA PAULA", "NUTRICIONISTA"), None),
+    (
+        "Impostos e Encargos",
+        _palavras("DARF", "GPS", "FGTS", "INSS", "SIMPLES NACIONAL", "IMPOSTO"),
+        None,
+    ),
+    (
+        "Transferência Interna / Sócios",
+        _palavras("TRANSFERENCIA", "PIX"),
+        _palavras("RICARDO", "LIZIANI", "LIZI"),
+    ),
+]
+
+
 def get_regras_sessao() -> dict:
     """Retorna as regras de categorização armazenadas na sessão."""
     if "regras_categoria" not in st.session_state:
@@ -153,57 +210,14 @@ def classificar_categoria(mov: dict, regras: dict | None = None) -> str:
         if padrao in desc_norm:
             return categoria
 
-    if "SANGRIA" in desc_norm:
-        return "Sangria"
-
-    if "RECEITA FEDERAL" in desc_norm or "RFB" in desc_norm:
-        return "Impostos e Encargos"
-
-    if "CLARO" in desc_norm:
-        return "Internet"
-    if "VIVO" in desc_norm and any(
-        kw in desc_norm for kw in ("CONCESSIONARIA", "VIVO-RS")
-    ):
-        return "Internet"
-
-    if "ANTINSECT" in desc_norm:
-        return "Dedetização / Controle de Pragas"
-
-    if "CIA ESTADUAL DE DIST" in desc_norm or "CEEE" in desc_norm or "ENERGIA ELETRICA" in desc_norm:
-        return "Energia Elétrica"
-
-    if "RECH CONTABILIDADE" in desc_norm or "RECH CONT" in desc_norm:
-        return "Contabilidade e RH"
-
-    if any(kw in desc_norm for kw in ("BUSINESS      0503-2852", "BUSINESS 0503-2852",
-                                       "ITAU UNIBANCO HOLDING S.A.", "CARTAO")):
-        return "Fatura Cartão"
-
-    if any(kw in desc_norm for kw in ("APLICACAO", "CDB", "CREDBANCRF")):
-        return "Investimentos (Aplicações)"
-
-    if any(kw in desc_norm for kw in ("REND PAGO APLIC", "RENDIMENTO APLIC", "REND APLIC", "RENDIMENTO")):
-        return "Rendimentos de Aplicações"
-
-    if "ZOOP" in desc_norm or "ALUGUEL" in desc_norm:
-        return "Aluguel Comercial"
+    return _classificar_sem_regras_salvas(desc_norm, valor)
 
-    if "MOTOBOY" in desc_norm or "ENTREGA" in desc_norm:
-        return "Motoboy / Entregas"
 
-    if any(kw in desc_norm for kw in ("CAROLINE", "VERONICA", "EVELLYN", "SALARIO", "FOLHA")):
-        return "Folha de Pagamento"
-
-    if "ANA PAULA" in desc_norm or "NUTRICIONISTA" in desc_norm:
-        return "Nutricionista"
-
-    if any(kw in desc_norm for kw in ("DARF", "GPS", "FGTS", "INSS", "SIMPLES NACIONAL", "IMPOSTO")):
-        return "Impostos e Encargos"
-
-    if any(kw in desc_norm for kw in ("TRANSFERENCIA", "PIX")) and any(
-        kw in desc_norm for kw in ("RICARDO", "LIZIANI", "LIZI")
-    ):
-        return "Transferência Interna / Sócios"
+def _classificar_sem_regras_salvas(desc_norm: str, valor) -> str:
+    """Regras fixas e, por fim, o sinal do valor (quando nenhuma regra salva casa)."""
+    for categoria, padrao, requisito in _REGRAS_PADRAO:
+        if padrao.search(desc_norm) and (requisito is None or requisito.search(desc_norm)):
+            return categoria
 
     if valor > 0:
         return "Vendas / Receitas"
@@ -211,3 +225,65 @@ def classificar_categoria(mov: dict, regras: dict | None = None) -> str:
         return "Fornecedores e Insumos"
 
     return "A Classificar"
+
+
+@st.cache_data(show_spinner=False)
+def _indice_regras(regras: dict) -> dict[str, str]:
+    """
+    Para cada padrão salvo, a categoria que o loop de regras devolveria para
+    uma descrição exatamente igual a ele (a primeira regra, na ordem, contida
+    no padrão). Como as regras aprendidas são descrições completas, a maioria
+    dos movimentos se resolve com uma consulta ao dict, sem varrer as regras.
+    """
+    itens = list(regras.items())
+    indice = {}
+    for padrao in regras:
+        for outro, categoria in itens:
+            if outro in padrao:
+                indice[padrao] = categoria
+                break
+    return indice
+
+
+@st.cache_resource(show_spinner=False)
+def _filtro_regras(regras: dict) -> re.Pattern | None:
+    """
+    Alternação compilada de todos os padrões salvos: um único scan em C diz se
+    alguma regra casa com a descrição. Cacheada pelo conteúdo das regras, então
+    salvar uma regra nova gera outro filtro automaticamente.
+    """
+    if not regras:
+        return None
+    return re.compile("|".join(re.escape(p) for p in regras))
+
+
+def classificar_movimentos(movimentos: list[dict], regras: dict | None = None) -> list[str]:
+    """
+    Classifica uma lista de movimentos.
+    A categoria só depende da descrição normalizada e do sinal do valor, então
+    as regras são avaliadas uma única vez por par distinto.
+    """
+    if regras is None:
+        regras = get_regras_sessao()
+    indice = _indice_regras(regras)
+    filtro = _filtro_regras(regras)
+
+    cache: dict[tuple[str, int], str] = {}
+    categorias = []
+    for mov in movimentos:
+        valor = mov.get("valor", 0.0)
+        desc_norm = normalizar_texto(mov.get("descricao"))
+        chave = (desc_norm, (valor > 0) - (valor < 0))
+        categoria = cache.get(chave)
+        if categoria is None:
+            categoria = indice.get(desc_norm)
+            if categoria is None:
+                # Sem nenhuma regra salva contida na descrição, pula a varredura
+                # (em Python) das regras e vai direto às regras fixas
+                if filtro is not None and filtro.search(desc_norm):
+                    categoria = classificar_categoria(mov, regras)
+                else:
+                    categoria = _classificar_sem_regras_salvas(desc_norm, valor)
+            cache[chave] = categoria
+        categorias.append(categoria)
+    return categorias
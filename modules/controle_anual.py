@@ -4,10 +4,11 @@ e monta o DRE mensal comparativo com alertas automáticos.
 """
 import re
 import unicodedata
+from io import BytesIO
 
 import pandas as pd
 
-from modules.gdrive import download_history_file, list_history_from_gdrive
+from modules.gdrive import download_history_files, list_history_from_gdrive
 from modules.utils import format_currency, get_ano_mes
 
 # Categorias que aparecem no DRE, na ordem desejada
@@ -57,12 +58,10 @@ def _ler_categorias_fechamento(buf) -> dict[str, float]:
         df.columns = ["Categoria", "Entradas", "Saídas"] + list(df.columns[3:])
         df["Entradas"] = pd.to_numeric(df["Entradas"], errors="coerce").fillna(0)
         df["Saídas"] = pd.to_numeric(df["Saídas"], errors="coerce").fillna(0)
-        resultado = {}
-        for _, row in df.iterrows():
-            cat = str(row["Categoria"]).strip()
-            if cat and cat != "nan":
-                resultado[cat] = float(row["Entradas"]) + float(row["Saídas"])
-        return resultado
+        cats = df["Categoria"].astype(str).str.strip()
+        validas = df["Categoria"].notna() & (cats != "") & (cats != "nan")
+        liquido = df["Entradas"].astype(float) + df["Saídas"].astype(float)
+        return dict(zip(cats[validas].tolist(), liquido[validas].tolist()))
     except Exception:
         return {}
 
@@ -81,26 +80,32 @@ def carregar_dre_anual() -> tuple[list[str], list[dict], dict]:
     except Exception:
         return [], [], {}
 
+    # (arquivo, YYYY-MM) dos fechamentos cujo nome identifica o período
     fechamentos = [
-        f for f in arquivos
+        (f, get_ano_mes(f.get("name", "")))
+        for f in arquivos
         if str(f.get("name", "")).startswith("fechamento_tempero_")
         and str(f.get("name", "")).endswith(".xlsx")
     ]
+    fechamentos = [(f, ano_mes) for f, ano_mes in fechamentos if ano_mes]
+
+    # Downloads em paralelo (e cacheados por versão do arquivo)
+    conteudos = download_history_files([f for f, _ in fechamentos])
 
     dados: dict[str, dict[str, float]] = {}  # {ano_mes: {categoria: valor}}
     resumos: dict[str, dict] = {}            # {ano_mes: {entradas, saidas, resultado}}
 
-    for f in fechamentos:
-        nome = f.get("name", "")
-        ano_mes = get_ano_mes(nome)
-        if not ano_mes:
+    for f, ano_mes in fechamentos:
+        conteudo = conteudos.get(f["id"])
+        if conteudo is None:
             continue
         try:
-            buf = download_history_file(f["id"])
+            buf = BytesIO(conteudo)
 
             # ResumoDados
             buf.seek(0)
-            df_rd = pd.read_excel(buf, sheet_name="ResumoDados")
+            # Só a primeira linha é usada: o leitor para de percorrer a aba depois dela
+            df_rd = pd.read_excel(buf, sheet_name="ResumoDados", nrows=1)
             if df_rd.empty:
                 continue
             linha = df_rd.iloc[0]
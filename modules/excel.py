@@ -1,6 +1,32 @@
-from openpyxl.styles import Font, Alignment, PatternFill
+from io import BytesIO
+
+import pandas as pd
+import streamlit as st
+from openpyxl.styles import Font, Alignment, NamedStyle, PatternFill
 from openpyxl.utils import get_column_letter
 
+# Colunas cujo nome começa com um destes prefixos recebem formato de moeda
+_PREFIXOS_MOEDA = ("entradas", "saídas", "saidas", "resultado", "saldo", "valor")
+
+# Estilo nomeado do cabeçalho: registrado uma vez por workbook e aplicado pelo nome.
+# A moeda fica só como number_format, para não apagar o estilo que o pandas já
+# deu à célula (negrito/borda do cabeçalho dele).
+_ESTILO_CABECALHO = "tempero_cabecalho"
+_FORMATO_MOEDA = '"R$" #,##0.00'
+# len("2025-01-31 00:00:00"): como o Excel mostra datas gravadas pelo pandas
+_LARGURA_DATA_HORA = 19
+
+
+def _registrar_estilos(wb):
+    """Registra o estilo nomeado do cabeçalho no workbook (só na primeira chamada)."""
+    if _ESTILO_CABECALHO in wb.named_styles:
+        return
+    cabecalho = NamedStyle(name=_ESTILO_CABECALHO)
+    cabecalho.font = Font(bold=True)
+    cabecalho.fill = PatternFill("solid", fgColor="DDDDDD")
+    cabecalho.alignment = Alignment(horizontal="center")
+    wb.add_named_style(cabecalho)
+
 
 def formatar_tabela_excel(ws, df, start_row=1):
     """
@@ -11,28 +37,91 @@ def formatar_tabela_excel(ws, df, start_row=1):
     """
     n_rows = len(df)
     n_cols = len(df.columns)
+    _registrar_estilos(ws.parent)
 
     for col_idx in range(1, n_cols + 1):
-        cell = ws.cell(row=start_row, column=col_idx)
-        cell.font = Font(bold=True)
-        cell.fill = PatternFill("solid", fgColor="DDDDDD")
-        cell.alignment = Alignment(horizontal="center")
+        ws.cell(row=start_row, column=col_idx).style = _ESTILO_CABECALHO
 
     ws.freeze_panes = ws[f"A{start_row + 1}"]
 
-    for col_idx in range(1, n_cols + 1):
-        max_len = 0
-        for row_idx in range(start_row, start_row + 1 + n_rows):
-            value = ws.cell(row=row_idx, column=col_idx).value
-            if value is not None:
-                max_len = max(max_len, len(str(value)))
+    # Largura calculada direto do DataFrame (vetorizado), sem reler as células.
+    # Datas saem na planilha como "YYYY-MM-DD HH:MM:SS" (formato padrão do
+    # pandas), não como o astype(str) delas: usam o tamanho renderizado.
+    for col_idx, col in enumerate(df.columns, start=1):
+        valores = df[col].dropna()
+        max_len = len(str(col))
+        if pd.api.types.is_datetime64_any_dtype(valores):
+            if not valores.empty:
+                max_len = max(max_len, _LARGURA_DATA_HORA)
+        elif not valores.empty:
+            max_len = max(max_len, int(valores.astype(str).str.len().max()))
         ws.column_dimensions[get_column_letter(col_idx)].width = max_len + 2
 
-    col_names_lower = [str(c).lower() for c in df.columns]
-    currency_prefixes = ("entradas", "saídas", "saidas", "resultado", "saldo", "valor")
-    for col_idx, col_name in enumerate(col_names_lower, start=1):
-        if any(col_name.startswith(p) for p in currency_prefixes):
-            for row_idx in range(start_row + 1, start_row + 1 + n_rows):
-                cell = ws.cell(row=row_idx, column=col_idx)
-                if isinstance(cell.value, (int, float)):
-                    cell.number_format = '"R$" #,##0.00'
+    money_cols = [
+        col_idx
+        for col_idx, col in enumerate(df.columns, start=1)
+        if str(col).lower().startswith(_PREFIXOS_MOEDA)
+    ]
+    # Quais linhas são numéricas sai do próprio DataFrame (sem reler o valor da célula).
+    # Os chamadores gravam com to_excel(startrow=start_row) (0-based): o cabeçalho
+    # do pandas fica na linha start_row + 1 e a linha i do df em start_row + 2 + i.
+    for col_idx in money_cols:
+        serie = df.iloc[:, col_idx - 1]
+        if pd.api.types.is_numeric_dtype(serie):
+            numericos = serie.notna().tolist()
+        else:
+            numericos = [isinstance(v, (int, float)) and v == v for v in serie.tolist()]
+        linhas = ws.iter_rows(
+            min_row=start_row + 2, max_row=start_row + 1 + n_rows, min_col=col_idx, max_col=col_idx
+        )
+        for (cell,), numerico in zip(linhas, numericos):
+            if numerico:
+                cell.number_format = _FORMATO_MOEDA
+
+
+@st.cache_data(show_spinner=False)
+def gerar_planilha_excel(
+    nome_periodo: str,
+    df_resumo_contas: pd.DataFrame,
+    df_consolidado: pd.DataFrame,
+    df_cat_export: pd.DataFrame,
+    df_mov: pd.DataFrame,
+    df_dinheiro: pd.DataFrame,
+) -> bytes:
+    """
+    Gera o relatório de fechamento (.xlsx) e retorna os bytes do arquivo.
+    Cacheado pelo conteúdo dos DataFrames: reruns sem mudança nos dados
+    reaproveitam o arquivo já montado.
+    """
+    buffer = BytesIO()
+    with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
+        start_row_resumo = 3
+        df_resumo_contas.to_excel(writer, sheet_name="Resumo", index=False, startrow=start_row_resumo)
+
+        start_row_consol = start_row_resumo + len(df_resumo_contas) + 3
+        df_consolidado.to_excel(writer, sheet_name="Resumo", index=False, startrow=start_row_consol)
+
+        df_consolidado.to_excel(writer, sheet_name="ResumoDados", index=False)
+        df_cat_export.to_excel(writer, sheet_name="Categorias", index=False, startrow=1)
+        df_mov.to_excel(writer, sheet_name="Movimentos", index=False, startrow=1)
+        df_dinheiro.to_excel(writer, sheet_name="Dinheiro", index=False, startrow=1)
+
+        ws_res = writer.sheets["Resumo"]
+        ws_cat = writer.sheets["Categorias"]
+        ws_mov = writer.sheets["Movimentos"]
+        ws_din = writer.sheets["Dinheiro"]
+
+        ws_res["A1"] = f"Fechamento Tempero das Gurias - {nome_periodo}"
+        ws_res["A1"].font = Font(bold=True, size=14)
+        ws_res["A1"].alignment = Alignment(horizontal="left")
+
+        formatar_tabela_excel(ws_res, df_resumo_contas, start_row=start_row_resumo)
+        formatar_tabela_excel(ws_res, df_consolidado, start_row=start_row_consol)
+        if not df_cat_export.empty:
+            formatar_tabela_excel(ws_cat, df_cat_export, start_row=1)
+        if not df_mov.empty:
+            formatar_tabela_excel(ws_mov, df_mov, start_row=1)
+        if not df_dinheiro.empty:
+            formatar_tabela_excel(ws_din, df_dinheiro, start_row=1)
+
+    return buffer.getvalue()
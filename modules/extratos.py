@@ -1,38 +1,43 @@
+import csv
+import re
 from io import BytesIO
 from pathlib import Path
 
 import pandas as pd
+import streamlit as st
 
-from modules.utils import extrair_descricao_linha, normalizar_texto, parse_numero_br
+from modules.utils import extrair_descricao_linha, normalizar_texto, parse_serie_br
 
+# Linhas de saldo (não são movimentos), já com a descrição normalizada
+_SALDO_ITAU_RE = re.compile("SALDO ANTERIOR|SALDO TOTAL DISPONIVEL DIA|SALDO DO DIA")
+_SALDO_PAGSEGURO_RE = re.compile("SALDO DO DIA|SALDO DIA")
 
-def ler_arquivo_tabela_upload(uploaded_file) -> list[dict]:
+_COLUNAS_DESCRICAO_CABECALHO = ["LANÇAMENTO", "LANCAMENTO", "LANÇAMENTOS", "DESCRIÇÃO", "DESCRICAO", "TIPO"]
+
+
+def ler_dataframe_upload(uploaded_file) -> pd.DataFrame:
     """
     Lê CSV/XLSX de bancos aceitando o extrato original, mesmo com cabeçalho
     e informações antes da tabela de dados.
     """
-    suffix = Path(uploaded_file.name).suffix.lower()
+    return _ler_dataframe(uploaded_file.getvalue(), uploaded_file.name)
+
+
+def _ler_dataframe(conteudo: bytes, nome: str) -> pd.DataFrame:
+    suffix = Path(nome).suffix.lower()
 
     if suffix in (".csv", ".txt"):
-        # sep=None com engine="python" detecta automaticamente o separador (;  ,  tab…)
-        df = pd.read_csv(uploaded_file, sep=None, engine="python")
+        df = _ler_csv(conteudo)
 
     elif suffix in (".xlsx", ".xls"):
-        # Lê os bytes uma única vez para poder reusar o stream caso o header não seja encontrado
-        raw_bytes = BytesIO(uploaded_file.read())
+        # Um único stream, reaproveitado caso o header não seja encontrado
+        raw_bytes = BytesIO(conteudo)
         raw = pd.read_excel(raw_bytes, header=None)
 
-        header_idx = None
-        for i, row in raw.iterrows():
-            valores = [str(x).strip().upper() for x in row.tolist() if not pd.isna(x)]
-            if not valores:
-                continue
-            if "DATA" in valores and any(
-                col in valores
-                for col in ["LANÇAMENTO", "LANCAMENTO", "LANÇAMENTOS", "DESCRIÇÃO", "DESCRICAO", "TIPO"]
-            ):
-                header_idx = i
-                break
+        # Procura o cabeçalho de uma vez: linha com "DATA" e alguma coluna de descrição
+        celulas = raw.apply(lambda c: c.astype(str).str.strip().str.upper()).where(raw.notna(), "")
+        eh_cabecalho = (celulas == "DATA").any(axis=1) & celulas.isin(_COLUNAS_DESCRICAO_CABECALHO).any(axis=1)
+        header_idx = eh_cabecalho.idxmax() if eh_cabecalho.any() else None
 
         if header_idx is not None:
             header_row = raw.iloc[header_idx].tolist()
@@ -49,100 +54,137 @@ def ler_arquivo_tabela_upload(uploaded_file) -> list[dict]:
     else:
         raise RuntimeError(f"Formato não suportado: {suffix}. Use .csv ou .xlsx.")
 
-    df = df.rename(columns=lambda c: str(c).strip())
+    return df.rename(columns=lambda c: str(c).strip())
 
-    return [
-        {(k.strip() if isinstance(k, str) else k): v for k, v in rec.items()}
-        for rec in df.to_dict(orient="records")
-    ]
 
+def _ler_csv(conteudo: bytes) -> pd.DataFrame:
+    """
+    Detecta o separador (;  ,  tab…) pela primeira linha, como o sep=None do
+    engine python faz, e lê com o engine C, bem mais rápido em extratos grandes.
+    Se a detecção falhar, cai no engine python, que repete a detecção e reporta o erro.
+    """
+    primeira_linha = BytesIO(conteudo).readline().decode("utf-8", errors="ignore").replace("\r\n", "\n")
+    try:
+        separador = csv.Sniffer().sniff(primeira_linha).delimiter
+    except csv.Error:
+        return pd.read_csv(BytesIO(conteudo), sep=None, engine="python")
+    return pd.read_csv(BytesIO(conteudo), sep=separador)
 
-def carregar_extrato_itau_upload(uploaded_file) -> tuple[float, float, float, list[dict]]:
-    entradas = 0.0
-    saidas = 0.0
-    movimentos = []
-
-    for linha in ler_arquivo_tabela_upload(uploaded_file):
-        descricao = extrair_descricao_linha(linha)
-        desc_norm = normalizar_texto(descricao)
-
-        if any(
-            kw in desc_norm
-            for kw in ("SALDO ANTERIOR", "SALDO TOTAL DISPONIVEL DIA", "SALDO DO DIA")
-        ):
+
+def ler_arquivo_tabela_upload(uploaded_file) -> list[dict]:
+    """Como ler_dataframe_upload, mas devolve as linhas como lista de dicts."""
+    # Após o rename todas as chaves já são str sem espaços: to_dict basta,
+    # sem re-percorrer cada registro para normalizar as chaves.
+    return ler_dataframe_upload(uploaded_file).to_dict(orient="records")
+
+
+def _colunas_por_trecho(colunas, *trechos: str) -> tuple:
+    """
+    Para cada trecho, retorna o nome original da (última) coluna cujo nome
+    normalizado o contém (ou None). Os nomes são normalizados uma única vez
+    por arquivo, qualquer que seja o número de trechos procurados.
+    """
+    norm_cols = {normalizar_texto(c.strip()): c for c in colunas if isinstance(c, str)}
+    achadas = dict.fromkeys(trechos)
+    for kn, orig in norm_cols.items():
+        for trecho in trechos:
+            if trecho in kn:
+                achadas[trecho] = orig
+    return tuple(achadas[t] for t in trechos)
+
+
+def _primeiro_preenchido(df: pd.DataFrame, colunas, padrao=None) -> pd.Series:
+    """
+    Equivalente por coluna de `linha.get(c1) or linha.get(c2) or ... or padrao`:
+    para cada linha, o primeiro valor "verdadeiro" entre as colunas candidatas.
+    """
+    out = pd.Series(padrao, index=df.index, dtype=object)
+    pendente = pd.Series(True, index=df.index)
+    for col in colunas:
+        if col not in df.columns:
             continue
+        preenchido = df[col].map(bool)
+        usar = pendente & preenchido
+        out[usar] = df.loc[usar, col]
+        pendente &= ~preenchido
+    return out
+
+
+def _descricoes(df: pd.DataFrame) -> tuple[list, pd.Series]:
+    """Descrição de cada linha e a respectiva versão normalizada (Series de str)."""
+    chaves_norm = {c: normalizar_texto(c.strip()) for c in df.columns if isinstance(c, str)}
+    descricoes = [
+        extrair_descricao_linha(linha, chaves_norm) for linha in df.to_dict(orient="records")
+    ]
+    desc_norm = pd.Series([normalizar_texto(d) for d in descricoes], index=df.index, dtype=object)
+    return descricoes, desc_norm
 
-        valor = parse_numero_br(
-            linha.get("Valor")
-            or linha.get("VALOR")
-            or linha.get("valor")
-            or linha.get("Valor (R$)")
-            or 0
-        )
-
-        if valor == 0.0:
-            debito = credito = 0.0
-            for k, v in linha.items():
-                if not isinstance(k, str):
-                    continue
-                kl = normalizar_texto(k.strip())
-                if "DEBITO" in kl:
-                    debito = parse_numero_br(v)
-                if "CREDITO" in kl:
-                    credito = parse_numero_br(v)
-            if debito != 0.0 or credito != 0.0:
-                valor = credito - debito
-
-        if valor > 0:
-            entradas += valor
-        elif valor < 0:
-            saidas += valor
-
-        movimentos.append({
-            "data": linha.get("Data") or linha.get("DATA") or linha.get("data"),
-            "descricao": descricao,
-            "valor": valor,
-            "conta": "Itau",
-        })
 
-    return entradas, saidas, entradas + saidas, movimentos
+def _valores_itau(df: pd.DataFrame) -> tuple[float, float, pd.Series]:
+    """Valor de cada linha do Itaú (coluna Valor ou crédito - débito) e os totais."""
+    valor = parse_serie_br(_primeiro_preenchido(df, ("Valor", "VALOR", "valor", "Valor (R$)"), 0))
 
+    # Sem coluna única de valor: usa crédito - débito (somente onde o valor ficou zerado)
+    zerado = valor == 0.0
+    if zerado.any():
+        col_debito, col_credito = _colunas_por_trecho(df.columns, "DEBITO", "CREDITO")
+        debito = parse_serie_br(df.loc[zerado, col_debito]) if col_debito else 0.0
+        credito = parse_serie_br(df.loc[zerado, col_credito]) if col_credito else 0.0
+        alt = pd.Series(credito - debito, index=df.index[zerado], dtype=float)
+        valor.loc[alt.index] = alt
+    valor = valor.astype(float)
 
-def carregar_extrato_pagseguro_upload(uploaded_file) -> tuple[float, float, float, list[dict]]:
-    entradas = 0.0
-    saidas = 0.0
-    movimentos = []
+    return float(valor[valor > 0].sum()), float(valor[valor < 0].sum()), valor
 
-    for linha in ler_arquivo_tabela_upload(uploaded_file):
-        descricao = extrair_descricao_linha(linha)
-        desc_norm = normalizar_texto(descricao)
 
-        if "SALDO DO DIA" in desc_norm or "SALDO DIA" in desc_norm:
-            continue
+def _valores_pagseguro(df: pd.DataFrame) -> tuple[float, float, pd.Series]:
+    """Valor de cada linha do PagSeguro (entradas - saídas) e os totais."""
+    entrada = parse_serie_br(_primeiro_preenchido(df, ("Entradas", "ENTRADAS", "entradas"), 0)).abs()
+    saida = parse_serie_br(
+        _primeiro_preenchido(df, ("Saidas", "SAIDAS", "Saídas", "saídas"), 0)
+    ).abs()
+    valor = (entrada - saida).astype(float)
+
+    # 0.0 - x (e não -x): sem saídas o total fica 0.0, não -0.0 ("R$ -0,00")
+    return float(entrada.sum()), 0.0 - float(saida.sum()), valor
+
+
+# Por conta: linhas de saldo a descartar e cálculo do valor de cada linha
+_EXTRATOS = {
+    "Itau": (_SALDO_ITAU_RE, _valores_itau),
+    "PagSeguro": (_SALDO_PAGSEGURO_RE, _valores_pagseguro),
+}
+
+
+# Cacheado pelo conteúdo do arquivo: reruns (troca de aba, filtros, edição do
+# caixa) não reprocessam o mesmo extrato. A classificação por categoria é feita
+# depois, fora do cache, então editar regras não exige invalidá-lo.
+@st.cache_data(show_spinner=False, max_entries=8)
+def _carregar_extrato(conteudo: bytes, nome: str, conta: str) -> tuple[float, float, float, list[dict]]:
+    """Lê o extrato da `conta` e devolve (entradas, saídas, resultado, movimentos)."""
+    saldo_re, calcular_valores = _EXTRATOS[conta]
+
+    df = _ler_dataframe(conteudo, nome)
+    descricoes, desc_norm = _descricoes(df)
 
-        entrada = parse_numero_br(
-            linha.get("Entradas") or linha.get("ENTRADAS") or linha.get("entradas") or 0
-        )
-        saida = parse_numero_br(
-            linha.get("Saidas") or linha.get("SAIDAS")
-            or linha.get("Saídas") or linha.get("saídas") or 0
-        )
-
-        valor = 0.0
-        if entrada != 0:
-            ent = abs(entrada)
-            valor += ent
-            entradas += ent
-        if saida != 0:
-            sai = abs(saida)
-            valor -= sai
-            saidas -= sai
-
-        movimentos.append({
-            "data": linha.get("Data") or linha.get("DATA") or linha.get("data"),
-            "descricao": descricao,
-            "valor": valor,
-            "conta": "PagSeguro",
-        })
+    manter = ~desc_norm.str.contains(saldo_re).astype(bool)
+    df = df.loc[manter]
+    descricoes = [d for d, m in zip(descricoes, manter) if m]
+
+    entradas, saidas, valor = calcular_valores(df)
+
+    datas = _primeiro_preenchido(df, ("Data", "DATA", "data"))
+    movimentos = [
+        {"data": data, "descricao": descricao, "valor": v, "conta": conta}
+        for data, descricao, v in zip(datas.tolist(), descricoes, valor.tolist())
+    ]
 
     return entradas, saidas, entradas + saidas, movimentos
+
+
+def carregar_extrato_itau_upload(uploaded_file) -> tuple[float, float, float, list[dict]]:
+    return _carregar_extrato(uploaded_file.getvalue(), uploaded_file.name, "Itau")
+
+
+def carregar_extrato_pagseguro_upload(uploaded_file) -> tuple[float, float, float, list[dict]]:
+    return _carregar_extrato(uploaded_file.getvalue(), uploaded_file.name, "PagSeguro")
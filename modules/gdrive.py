@@ -1,4 +1,6 @@
 import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
 
 import pandas as pd
@@ -6,38 +8,78 @@ import streamlit as st
 from google.auth.exceptions import RefreshError
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
+from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
-from googleapiclient.http import MediaIoBaseDownload, MediaIoBaseUpload
+from googleapiclient.http import MediaIoBaseDownload, MediaIoBaseUpload, build_http
+
+# Upload resumable só compensa para arquivos grandes: exige uma chamada extra
+# para abrir a sessão. Fechamentos e JSONs ficam bem abaixo deste limite.
+_RESUMABLE_MIN_BYTES = 5 * 1024 * 1024
+# Tamanho de cada pedaço no upload resumable (múltiplo de 256 KB exigido pela API);
+# o padrão da biblioteca (100 MB) enviaria o arquivo inteiro de uma vez.
+_RESUMABLE_CHUNK_BYTES = 1024 * 1024
 
 
 # ---------------------------------------------------------------------------
 # Serviço / autenticação
 # ---------------------------------------------------------------------------
 
-def get_gdrive_service():
-    """
-    Cria o cliente da API do Google Drive usando OAuth (token em st.secrets["gdrive_oauth"]).
-    Faz refresh explícito do token e trata erros de autenticação (invalid_grant).
-    """
+def _segredos_gdrive() -> tuple:
+    """Valores de st.secrets["gdrive_oauth"] usados nas credenciais (chave do cache)."""
     info = st.secrets["gdrive_oauth"]
 
     scopes = info.get("scopes", ["https://www.googleapis.com/auth/drive"])
     if isinstance(scopes, str):
         scopes = [scopes]
 
-    creds = Credentials(
-        token=info.get("token"),
-        refresh_token=info.get("refresh_token"),
-        token_uri=info.get("token_uri"),
-        client_id=info.get("client_id"),
-        client_secret=info.get("client_secret"),
-        scopes=scopes,
+    return (
+        info.get("token"),
+        info.get("refresh_token"),
+        info.get("token_uri"),
+        info.get("client_id"),
+        info.get("client_secret"),
+        tuple(scopes),
     )
 
+
+@st.cache_resource(show_spinner=False)
+def _credenciais_gdrive(segredos: tuple) -> Credentials:
+    token, refresh_token, token_uri, client_id, client_secret, scopes = segredos
+    return Credentials(
+        token=token,
+        refresh_token=refresh_token,
+        token_uri=token_uri,
+        client_id=client_id,
+        client_secret=client_secret,
+        scopes=list(scopes),
+    )
+
+
+def get_gdrive_credentials() -> Credentials:
+    """
+    Credenciais OAuth do Google Drive (token em st.secrets["gdrive_oauth"]),
+    compartilhadas entre sessões. O cache é chaveado pelos próprios valores das
+    secrets: trocar o token lá gera credenciais novas sem reiniciar o processo.
+    """
+    return _credenciais_gdrive(_segredos_gdrive())
+
+
+def get_gdrive_service():
+    """
+    Cria o cliente da API do Google Drive usando OAuth (token em st.secrets["gdrive_oauth"]).
+    Faz refresh explícito do token e trata erros de autenticação (invalid_grant).
+    O cliente é criado uma vez por sessão e guardado em st.session_state: a
+    conexão httplib2 dele não é thread-safe, então não pode ser compartilhada
+    entre sessões; só as credenciais são comuns a todas. Se as credenciais
+    mudarem (secrets atualizadas), o cliente da sessão é recriado.
+    """
     try:
+        creds = get_gdrive_credentials()
         if not creds.valid:
             if creds.refresh_token:
+                # Renovado aqui (e não dentro de uma chamada qualquer à API)
+                # para que um invalid_grant caia no tratamento abaixo
                 creds.refresh(Request())
             else:
                 st.error(
@@ -45,9 +87,15 @@ def get_gdrive_service():
                     "Reconfigure a seção [gdrive_oauth] nas secrets do Streamlit."
                 )
                 st.stop()
-        return build("drive", "v3", credentials=creds)
+
+        guardado = st.session_state.get("_gdrive_service")
+        if guardado is not None and guardado[0] is creds:
+            return guardado[1]
+        service = build("drive", "v3", credentials=creds, cache_discovery=False)
 
     except RefreshError as e:
+        # Não mantém credenciais que já falharam: a próxima tentativa remonta
+        _credenciais_gdrive.clear()
         if "invalid_grant" in str(e):
             st.error(
                 "Erro de autenticação com o Google Drive: o token foi expirado ou revogado.\n\n"
@@ -66,43 +114,60 @@ def get_gdrive_service():
         st.error(f"Erro inesperado ao inicializar o Google Drive: {e}")
         st.stop()
 
+    st.session_state["_gdrive_service"] = (creds, service)
+    return service
+
 
 # ---------------------------------------------------------------------------
 # Pasta de históricos
 # ---------------------------------------------------------------------------
 
-def get_history_folder_id(service) -> str:
-    """Obtém (ou cria) a pasta de históricos no Google Drive."""
-    if "gdrive_history_folder_id" in st.session_state:
-        return st.session_state["gdrive_history_folder_id"]
-
-    folder_name = st.secrets.get("GDRIVE_FOLDER_NAME", "Tempero_Fechamentos")
+@st.cache_data(ttl=3600, show_spinner=False)
+def _buscar_pasta_historico(folder_name: str, _service) -> str:
+    """
+    Localiza (ou cria) a pasta pelo nome. Cacheado por folder_name entre
+    sessões: o id da pasta praticamente nunca muda.
+    """
     query = (
         f"mimeType = 'application/vnd.google-apps.folder' "
         f"and name = '{folder_name}' and trashed = false"
     )
     results = (
-        service.files()
-        .list(q=query, spaces="drive", fields="files(id, name)", pageSize=10)
+        _service.files()
+        .list(q=query, spaces="drive", fields="files(id)", pageSize=1)
         .execute()
     )
     files = results.get("files", [])
     if files:
-        folder_id = files[0]["id"]
-    else:
-        metadata = {"name": folder_name, "mimeType": "application/vnd.google-apps.folder"}
-        folder = service.files().create(body=metadata, fields="id").execute()
-        folder_id = folder["id"]
+        return files[0]["id"]
 
-    st.session_state["gdrive_history_folder_id"] = folder_id
-    return folder_id
+    metadata = {"name": folder_name, "mimeType": "application/vnd.google-apps.folder"}
+    folder = _service.files().create(body=metadata, fields="id").execute()
+    return folder["id"]
+
+
+def get_history_folder_id(service) -> str:
+    """Obtém (ou cria) a pasta de históricos no Google Drive."""
+    folder_name = st.secrets.get("GDRIVE_FOLDER_NAME", "Tempero_Fechamentos")
+    return _buscar_pasta_historico(folder_name, service)
+
+
+def make_media_upload(buffer: BytesIO, mimetype: str) -> MediaIoBaseUpload:
+    """Monta o MediaIoBaseUpload, usando upload simples (1 chamada) para arquivos pequenos."""
+    tamanho = buffer.seek(0, 2)
+    buffer.seek(0)
+    if tamanho > _RESUMABLE_MIN_BYTES:
+        return MediaIoBaseUpload(
+            buffer, mimetype=mimetype, chunksize=_RESUMABLE_CHUNK_BYTES, resumable=True
+        )
+    return MediaIoBaseUpload(buffer, mimetype=mimetype, resumable=False)
 
 
 def _find_file_in_folder(service, folder_id: str, filename: str) -> str | None:
     query = f"'{folder_id}' in parents and trashed = false and name = '{filename}'"
     results = (
         service.files()
-        .list(q=query, spaces="drive", fields="files(id, name)", pageSize=5)
+        .list(q=query, spaces="drive", fields="files(id)", pageSize=1)
         .execute()
     )
     files = results.get("files", [])
@@ -113,23 +178,31 @@ def _find_file_in_folder(service, folder_id: str, filename: str) -> str | None:
 # JSON no Drive
 # ---------------------------------------------------------------------------
 
+@st.cache_data(ttl=60, show_spinner=False)
+def _baixar_json_historico(filename: str):
+    """
+    Baixa um JSON (por nome) da pasta de históricos; None se não existir.
+    Cacheado por 60s para não baixar regras/categorias a cada rerun;
+    save_json_to_gdrive_history limpa o cache. Falhas de rede/API sobem como
+    exceção, e o st.cache_data não guarda resultado de chamadas que falharam.
+    """
+    service = get_gdrive_service()
+    folder_id = get_history_folder_id(service)
+    file_id = _find_file_in_folder(service, folder_id, filename)
+    if not file_id:
+        return None
+
+    return json.load(download_history_file(file_id, service))
+
+
 def load_json_from_gdrive_history(filename: str):
-    """Carrega um JSON (por nome) da pasta de históricos."""
+    """
+    Carrega um JSON (por nome) da pasta de históricos.
+    Retorna None se o arquivo não existir ou se o Drive falhar; a falha não é
+    cacheada, então o próximo rerun tenta de novo.
+    """
     try:
-        service = get_gdrive_service()
-        folder_id = get_history_folder_id(service)
-        file_id = _find_file_in_folder(service, folder_id, filename)
-        if not file_id:
-            return None
-
-        request = service.files().get_media(fileId=file_id)
-        fh = BytesIO()
-        downloader = MediaIoBaseDownload(fh, request)
-        done = False
-        while not done:
-            _, done = downloader.next_chunk()
-        fh.seek(0)
-        return json.load(fh)
+        return _baixar_json_historico(filename)
     except Exception:
         return None
 
@@ -140,14 +213,16 @@ def save_json_to_gdrive_history(filename: str, payload):
     folder_id = get_history_folder_id(service)
 
     data_bytes = json.dumps(payload, ensure_ascii=False, indent=2).encode("utf-8")
-    media = MediaIoBaseUpload(BytesIO(data_bytes), mimetype="application/json", resumable=False)
+    media = make_media_upload(BytesIO(data_bytes), "application/json")
 
     file_id = _find_file_in_folder(service, folder_id, filename)
     if file_id:
-        service.files().update(fileId=file_id, media_body=media).execute()
+        service.files().update(fileId=file_id, media_body=media, fields="id").execute()
     else:
         metadata = {"name": filename, "parents": [folder_id], "mimeType": "application/json"}
         service.files().create(body=metadata, media_body=media, fields="id").execute()
+        list_history_from_gdrive.clear()
+    _baixar_json_historico.clear()
 
 
 # ---------------------------------------------------------------------------
@@ -161,26 +236,29 @@ def upload_history_to_gdrive(buffer: BytesIO, filename: str) -> str:
     """
     service = get_gdrive_service()
     folder_id = get_history_folder_id(service)
-    buffer.seek(0)
-
-    media = MediaIoBaseUpload(
-        buffer,
-        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        resumable=False,
+    media = make_media_upload(
+        buffer, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
     )
 
     existing_id = _find_file_in_folder(service, folder_id, filename)
     if existing_id:
-        file = service.files().update(fileId=existing_id, media_body=media).execute()
-        return file["id"]
+        file = service.files().update(fileId=existing_id, media_body=media, fields="id").execute()
+        # modifiedTime mudou: a listagem (e a chave dos downloads cacheados) precisa refletir
+        list_history_from_gdrive.clear()
     else:
         metadata = {"name": filename, "parents": [folder_id]}
         file = service.files().create(body=metadata, media_body=media, fields="id, name").execute()
-        return file["id"]
+        list_history_from_gdrive.clear()
+    return file["id"]
 
 
+@st.cache_data(ttl=60, show_spinner=False)
 def list_history_from_gdrive() -> list[dict]:
-    """Lista arquivos salvos na pasta de históricos (id, name, modifiedTime)."""
+    """
+    Lista arquivos salvos na pasta de históricos (id, name, modifiedTime).
+    Cacheado por 60s para não consultar o Drive a cada rerun; as funções que
+    gravam/excluem no histórico limpam o cache.
+    """
     service = get_gdrive_service()
     folder_id = get_history_folder_id(service)
 
@@ -192,7 +270,8 @@ def list_history_from_gdrive() -> list[dict]:
             spaces="drive",
             fields="nextPageToken, files(id, name, modifiedTime)",
             orderBy="modifiedTime desc",
-            pageSize=100,
+            # 1000 é o máximo da API: históricos usuais cabem em uma única chamada
+            pageSize=1000,
         )
         if page_token:
             kwargs["pageToken"] = page_token
@@ -206,10 +285,17 @@ def list_history_from_gdrive() -> list[dict]:
     return all_files
 
 
-def download_history_file(file_id: str) -> BytesIO:
-    """Faz download de um arquivo do histórico e retorna BytesIO."""
-    service = get_gdrive_service()
+def download_history_file(file_id: str, service=None, http=None) -> BytesIO:
+    """
+    Faz download de um arquivo do histórico e retorna o próprio BytesIO
+    preenchido (já posicionado no início), sem cópia extra do conteúdo.
+    `http` permite usar uma conexão própria (necessário fora da thread principal).
+    """
+    if service is None:
+        service = get_gdrive_service()
     request = service.files().get_media(fileId=file_id)
+    if http is not None:
+        request.http = http
     buf = BytesIO()
     downloader = MediaIoBaseDownload(buf, request)
     done = False
@@ -219,10 +305,89 @@ def download_history_file(file_id: str) -> BytesIO:
     return buf
 
 
+@st.cache_resource(show_spinner=False)
+def _downloads_historico() -> dict[str, tuple[str, bytes]]:
+    """
+    Conteúdo baixado do histórico, compartilhado entre sessões:
+    {file_id: (modifiedTime, bytes)}. Uma entrada por arquivo (a versão mais
+    recente substitui a anterior), então o histórico inteiro cabe sem despejar
+    entradas que o próximo rerun vai pedir de novo.
+    """
+    return {}
+
+
+def _download_em_cache(file_id: str, modified_time: str) -> bytes | None:
+    if not modified_time:
+        return None
+    guardado = _downloads_historico().get(file_id)
+    if guardado is not None and guardado[0] == modified_time:
+        return guardado[1]
+    return None
+
+
+def _guardar_download(file_id: str, modified_time: str, conteudo: bytes):
+    if modified_time:
+        _downloads_historico()[file_id] = (modified_time, conteudo)
+
+
+def download_history_bytes(file_id: str, modified_time: str = "") -> bytes:
+    """
+    Conteúdo de um arquivo do histórico, cacheado por (id, modifiedTime):
+    o comparativo, os botões de download e o controle anual reaproveitam
+    o mesmo download, e uma nova versão do arquivo muda a chave.
+    """
+    conteudo = _download_em_cache(file_id, modified_time)
+    if conteudo is None:
+        conteudo = download_history_file(file_id).getvalue()
+        _guardar_download(file_id, modified_time, conteudo)
+    return conteudo
+
+
+def download_history_files(arquivos: list[dict], max_workers: int = 8) -> dict[str, bytes | None]:
+    """
+    Baixa vários arquivos do histórico em paralelo (a espera é de rede).
+    Retorna {file_id: conteúdo}, com None para os arquivos que falharam.
+    O que já está em cache é resolvido aqui, na thread do script; as threads
+    só baixam o que falta e não tocam em st.session_state nem nos caches do
+    Streamlit. O httplib2 do cliente da sessão não é thread-safe, então cada
+    thread usa a sua própria conexão autenticada com as mesmas credenciais.
+    """
+    conteudos = {
+        f["id"]: _download_em_cache(f["id"], f.get("modifiedTime", "")) for f in arquivos
+    }
+    faltando = [f for f in arquivos if conteudos[f["id"]] is None]
+    if not faltando:
+        return conteudos
+
+    service = get_gdrive_service()
+    creds = get_gdrive_credentials()
+    local = threading.local()
+
+    def _baixar(file_info: dict) -> bytes | None:
+        if not hasattr(local, "http"):
+            local.http = AuthorizedHttp(creds, http=build_http())
+        try:
+            return download_history_file(file_info["id"], service, http=local.http).getvalue()
+        except Exception:
+            return None
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(faltando))) as executor:
+        baixados = list(executor.map(_baixar, faltando))
+
+    for file_info, conteudo in zip(faltando, baixados):
+        conteudos[file_info["id"]] = conteudo
+        if conteudo is not None:
+            _guardar_download(file_info["id"], file_info.get("modifiedTime", ""), conteudo)
+    return conteudos
+
+
 def delete_history_file(file_id: str):
     """Exclui um arquivo do histórico."""
     service = get_gdrive_service()
     service.files().delete(fileId=file_id).execute()
+    _downloads_historico().pop(file_id, None)
+    list_history_from_gdrive.clear()
+    _baixar_json_historico.clear()
 
 
 # ---------------------------------------------------------------------------
@@ -1,13 +1,16 @@
+import numpy as np
+import pandas as pd
 import streamlit as st
 
+from modules.utils import format_currency
+
 PRIMARY_COLOR = "#F06BAA"
 BACKGROUND_SOFT = "#FDF2F7"
 TEXT_DARK = "#333333"
 
 
-def inject_css():
-    st.markdown(
-        f"""
+# Constantes de cor fixas: o bloco de CSS é montado uma única vez na importação.
+_CSS_BLOB = f"""
         <style>
         .block-container {{
             max-width: 1200px;
@@ -44,6 +47,15 @@ def inject_css():
             border-radius: 0.8rem;
             box-shadow: 0 2px 8px rgba(0,0,0,0.18);
         }}
+        .tempero-metric-row {{
+            display: flex;
+            flex-wrap: wrap;
+            gap: 1rem;
+        }}
+        .tempero-metric-row .tempero-metric-card {{
+            flex: 1 1 0;
+            min-width: 180px;
+        }}
         .tempero-metric-label {{
             font-size: 0.85rem;
             opacity: 0.9;
@@ -81,9 +93,12 @@ def inject_css():
             font-size: 0.9rem;
         }}
         </style>
-        """,
-        unsafe_allow_html=True,
-    )
+        """
+
+
+def inject_css():
+    # Reenviado a cada rerun: o Streamlit remove elementos não emitidos na execução atual.
+    st.markdown(_CSS_BLOB, unsafe_allow_html=True)
 
 
 def metric_card_html(label: str, value: str) -> str:
@@ -93,3 +108,25 @@ def metric_card_html(label: str, value: str) -> str:
       <div class="tempero-metric-value">{value}</div>
     </div>
     """
+
+
+def metric_cards_row_html(cards) -> str:
+    """Monta uma linha de metric cards em um único bloco HTML (um só st.markdown)."""
+    cards_html = "".join(metric_card_html(label, value).strip() for label, value in cards)
+    return f'<div class="tempero-metric-row">{cards_html}</div>'
+
+
+def formatar_colunas_moeda(df: pd.DataFrame, colunas, vazio: str = "-") -> pd.DataFrame:
+    """
+    Retorna uma cópia de df com as colunas de valor formatadas como moeda (R$).
+    Todas as colunas são formatadas em uma única passada; valores vazios ou
+    não numéricos viram `vazio`.
+    """
+    out = df.copy()
+    cols = [c for c in colunas if c in out.columns]
+    if not cols:
+        return out
+    valores = out[cols].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+    textos = [format_currency(v) if v == v else vazio for v in valores.ravel().tolist()]
+    out[cols] = np.array(textos, dtype=object).reshape(valores.shape)
+    return out
@@ -2,6 +2,13 @@ import math
 import re
 import unicodedata
 from datetime import datetime
+from functools import lru_cache
+
+import pandas as pd
+
+# "1.234,56" → "1234.56" numa única passada (remove milhar, troca vírgula por ponto)
+_BR_PARA_FLOAT = str.maketrans({".": None, ",": "."})
+_MILHAR_SEM_VIRGULA_RE = re.compile(r"^\d{1,3}(\.\d{3})+$")
 
 
 def parse_numero_br(valor):
@@ -20,24 +27,73 @@ def parse_numero_br(valor):
 
     if "," in s:
         # formato BR: "1.234,56" → remove ponto de milhar, troca vírgula por ponto
-        s = s.replace(".", "").replace(",", ".")
-    elif re.match(r"^\d{1,3}(\.\d{3})+$", s):
+        s = s.translate(_BR_PARA_FLOAT)
+    elif _MILHAR_SEM_VIRGULA_RE.match(s):
         # ponto de milhar sem vírgula: "1.234" → "1234"
         s = s.replace(".", "")
     return float(s)
 
 
+def parse_serie_br(serie: pd.Series) -> pd.Series:
+    """
+    parse_numero_br aplicado à coluna inteira com operações de string do pandas
+    (sem uma chamada Python por célula). Células não textuais seguem a regra
+    numérica (None/NaN e outros tipos → 0.0); texto inválido levanta ValueError.
+    """
+    s = serie.astype(object)
+    eh_txt = s.map(type).eq(str)
+
+    out = pd.to_numeric(s.where(~eh_txt), errors="coerce").astype(float).fillna(0.0)
+    if not eh_txt.any():
+        return out
+
+    txt = s[eh_txt].str.replace("R$", "", regex=False).str.strip()
+    txt = txt[~txt.isin(["", "-"])]
+    com_virgula = txt.str.contains(",", regex=False)
+    milhar = ~com_virgula & txt.str.match(_MILHAR_SEM_VIRGULA_RE)
+    txt = txt.where(~(com_virgula | milhar), txt.str.replace(".", "", regex=False))
+    txt = txt.where(~com_virgula, txt.str.replace(",", ".", regex=False))
+
+    out.loc[eh_txt] = 0.0
+    # astype(float) converte cada str como float() (mesmo valor e mesmo erro)
+    out.loc[txt.index] = txt.astype(float)
+    return out
+
+
+@lru_cache(maxsize=8192)
+def _normalizar_str(s: str) -> str:
+    # Extratos repetem muito as mesmas descrições (tarifas, PIX, fornecedores)
+    return unicodedata.normalize("NFD", s.upper()).encode("ascii", "ignore").decode("ascii")
+
+
 def normalizar_texto(txt) -> str:
     if txt is None:
         return ""
-    s = str(txt).upper()
-    return unicodedata.normalize("NFD", s).encode("ascii", "ignore").decode("ascii")
+    return _normalizar_str(str(txt))
 
 
-def extrair_descricao_linha(linha: dict):
+# Colunas (já normalizadas) que não entram na descrição complementar
+_CANDIDATOS_IGNORADOS = frozenset({
+    "DATA", "VALOR", "VALORES",
+    "DEBITO", "DEBITO(-)", "DEBITO (+)", "DEBITO (-)",
+    "CREDITO", "CREDITO(+)", "CREDITO (+)", "CREDITO (-)",
+    "ENTRADA", "ENTRADAS", "SAIDA", "SAIDAS", "SALDO",
+})
+
+
+def extrair_descricao_linha(linha: dict, chaves_norm: dict | None = None):
+    """
+    Monta a descrição da linha a partir das colunas de histórico/descrição,
+    complementada pelos demais campos textuais.
+    `chaves_norm` ({coluna: nome normalizado}) pode ser calculado uma única vez
+    por arquivo e reaproveitado em todas as linhas.
+    """
     if "descricao" in linha and linha["descricao"] not in (None, ""):
         return linha["descricao"]
 
+    if chaves_norm is None:
+        chaves_norm = {k: normalizar_texto(k.strip()) for k in linha if isinstance(k, str)}
+
     partes = []
 
     for k, v in linha.items():
@@ -45,54 +101,53 @@ def extrair_descricao_linha(linha: dict):
             continue
         if v is None:
             continue
-        kl = normalizar_texto(k.strip())
+        kl = chaves_norm[k]
         vs = str(v).strip()
         if vs == "":
             continue
         if "HIST" in kl or "DESCR" in kl:
             partes.append(vs)
 
-    candidatos_ignorados = {
-        "DATA", "VALOR", "VALORES",
-        "DEBITO", "DEBITO(-)", "DEBITO (+)", "DEBITO (-)",
-        "CREDITO", "CREDITO(+)", "CREDITO (+)", "CREDITO (-)",
-        "ENTRADA", "ENTRADAS", "SAIDA", "SAIDAS", "SALDO",
-    }
-
+    vistos = set(partes)
     for k, v in linha.items():
         if not isinstance(k, str):
             continue
         if v is None:
             continue
-        kl = normalizar_texto(k.strip())
+        kl = chaves_norm[k]
         vs = str(v).strip()
-        if vs == "" or kl in candidatos_ignorados or vs in partes:
+        if vs == "" or kl in _CANDIDATOS_IGNORADOS or vs in vistos:
             continue
+        vistos.add(vs)
         partes.append(vs)
 
     return " | ".join(partes) if partes else None
 
 
+# Troca "," <-> "." (padrão en-US -> pt-BR) numa única passada
+_EN_PARA_BR = str.maketrans({",": ".", ".": ","})
+
+
 def format_currency(valor) -> str:
-    return f"R$ {valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+    return f"R$ {valor:,.2f}".translate(_EN_PARA_BR)
+
+
+# Acentos → letra base e separadores → "_", numa única passada de translate
+_SLUG_TABELA = str.maketrans({
+    "á": "a", "à": "a", "ã": "a", "â": "a",
+    "é": "e", "ê": "e",
+    "í": "i",
+    "ó": "o", "ô": "o", "õ": "o",
+    "ú": "u",
+    "ç": "c",
+    " ": "_", "/": "_", "\\": "_", "|": "_", ";": "_", ",": "_",
+})
+_SLUG_UNDERSCORES_RE = re.compile(r"_{2,}")
 
 
 def slugify(texto: str) -> str:
-    s = texto.strip().lower()
-    repl = {
-        "á": "a", "à": "a", "ã": "a", "â": "a",
-        "é": "e", "ê": "e",
-        "í": "i",
-        "ó": "o", "ô": "o", "õ": "o",
-        "ú": "u",
-        "ç": "c",
-    }
-    for a, b in repl.items():
-        s = s.replace(a, b)
-    for ch in [" ", "/", "\\", "|", ";", ","]:
-        s = s.replace(ch, "_")
-    while "__" in s:
-        s = s.replace("__", "_")
+    s = texto.strip().lower().translate(_SLUG_TABELA)
+    s = _SLUG_UNDERSCORES_RE.sub("_", s)
     return s.strip("_") or "periodo"
 
 
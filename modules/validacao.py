@@ -73,11 +73,13 @@ def validar_consistencia_fechamento(
                     f"Relatório = {format_currency(conta['Resultado'])}"
                 )
 
-        # 5. Movimentos por conta vs resumo por conta
+        # 5. Movimentos por conta vs resumo por conta (um groupby em vez de um filtro por conta)
+        soma_mov_por_conta = df_mov.groupby("Conta", sort=False)["Valor"].sum()
+        resultado_por_conta = df_resumo_contas.drop_duplicates("Conta").set_index("Conta")["Resultado"]
         for conta_nome in ("Itaú", "PagSeguro", "Dinheiro"):
-            if conta_nome in df_mov["Conta"].values and conta_nome in df_resumo_contas["Conta"].values:
-                soma_mov = df_mov[df_mov["Conta"] == conta_nome]["Valor"].sum()
-                resumo_result = df_resumo_contas[df_resumo_contas["Conta"] == conta_nome].iloc[0]["Resultado"]
+            if conta_nome in soma_mov_por_conta.index and conta_nome in resultado_por_conta.index:
+                soma_mov = soma_mov_por_conta[conta_nome]
+                resumo_result = resultado_por_conta[conta_nome]
                 diff = abs(soma_mov - resumo_result)
                 if diff > 0.01:
                     avisos.append(